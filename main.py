@@ -1,7 +1,9 @@
 import argparse
 import sys
 import os
+import signal
 import subprocess # Para executar o chatbot
+from datetime import datetime
 from pathlib import Path
 
 # --- Configuração de Caminhos Base ---
@@ -9,6 +11,7 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent
 INPUT_DIR = BASE_DIR / 'input_pdfs'
 OUTPUT_DIR = BASE_DIR / 'output_payslips'
+PROFILE_DIR = BASE_DIR / 'profiles'
 SRC_DIR = BASE_DIR / 'src'
 
 # Adiciona a pasta 'src' ao sys.path para que possamos importar os módulos
@@ -20,6 +23,7 @@ try:
     # Importa as funções específicas que serão chamadas
     from pdf_processor import split_encrypt_pdf
     from proactive_sender import run_proactive_distribution
+    from profiler import profile_run, PROFILE_MODES, DEFAULT_PROFILE_MODE
     # Não precisamos importar chatbot_app diretamente, vamos executá-lo como script
 except ImportError as e:
     print(f"Erro: Não foi possível importar módulos necessários da pasta 'src'.")
@@ -27,6 +31,15 @@ except ImportError as e:
     print(f"Detalhe do erro: {e}")
     sys.exit(1)
 
+def get_profile_prefix(args):
+    """Retorna o prefixo dos arquivos de perfilamento, ou None se --profile não foi usado."""
+    if args.profile is None:
+        return None
+    if args.profile:
+        return Path(args.profile).resolve()
+    # --profile sem valor: profiles/<acao>-<data_hora>
+    return PROFILE_DIR / f"{args.action}-{datetime.now():%Y%m%d-%H%M%S}"
+
 def run_process(args):
     """Executa a Fase 1: Processamento do PDF Mestre."""
     print("--- Executando Fase 1: Processamento de PDF ---")
@@ -50,7 +63,7 @@ def run_process(args):
     print(f"Diretório de Saída: {OUTPUT_DIR}")
 
     try:
-        generated_files = split_encrypt_pdf(str(master_pdf_path), str(OUTPUT_DIR), competence)
+        generated_files = split_encrypt_pdf(str(master_pdf_path), str(OUTPUT_DIR), competence, use_mmap=args.mmap)
         print(f"--- Processamento concluído. {len(generated_files)} arquivos gerados. ---")
     except Exception as e:
         print(f"Erro durante o processamento do PDF: {e}")
@@ -83,7 +96,7 @@ def run_send(args):
     print("Lembre-se da necessidade de uma 'media_url' pública para os PDFs (configurada dentro de proactive_sender.py ou via servidor/ngrok).")
 
     try:
-        run_proactive_distribution(str(master_pdf_path), competence, str(OUTPUT_DIR))
+        run_proactive_distribution(str(master_pdf_path), competence, str(OUTPUT_DIR), use_mmap=args.mmap)
         print(f"--- Envio proativo concluído. Verifique os logs para detalhes. ---")
     except Exception as e:
         print(f"Erro durante o envio proativo: {e}")
@@ -106,10 +119,31 @@ def run_chatbot(args):
     print("Se estiver rodando localmente, lembre-se de usar o ngrok.")
     print("-------------------------------------------------------------")
 
+    command = [sys.executable, str(chatbot_script_path)]
+    profile_prefix = get_profile_prefix(args)
+    if profile_prefix:
+        # O chatbot roda em outro processo, então é perfilado pelo próprio profiler.py
+        print(f"Perfilamento ativo. Resultados em: {profile_prefix}.*")
+        command = [sys.executable, str(SRC_DIR / 'profiler.py'), str(profile_prefix), args.profile_mode, str(chatbot_script_path)]
+
     try:
         # Executa o script Flask. Ele assumirá o controle do terminal.
         # Usamos sys.executable para garantir que estamos usando o mesmo interpretador Python.
-        subprocess.run([sys.executable, str(chatbot_script_path)], check=True)
+        if profile_prefix:
+            # O Ctrl+C chega também ao chatbot. subprocess.run mataria o filho 0,25s depois,
+            # antes de ele gravar os arquivos de perfilamento; então o pai ignora o sinal e espera.
+            # O sinal só é ignorado após o Popen, senão o filho herdaria o SIG_IGN.
+            process = subprocess.Popen(command)
+            previous_handler = signal.signal(signal.SIGINT, signal.SIG_IGN)
+            try:
+                returncode = process.wait()
+            finally:
+                signal.signal(signal.SIGINT, previous_handler)
+            if returncode != 0:
+                raise subprocess.CalledProcessError(returncode, command)
+            print("\n--- Servidor do Chatbot encerrado. ---")
+        else:
+            subprocess.run(command, check=True)
     except KeyboardInterrupt:
         print("\n--- Servidor do Chatbot interrompido pelo usuário. ---")
     except subprocess.CalledProcessError as e:
@@ -129,20 +163,34 @@ if __name__ == "__main__":
     parser_process = subparsers.add_parser('process', help='Executa apenas a divisão e encriptação dos PDFs (Fase 1).')
     parser_process.add_argument('--pdf', required=True, help='Caminho para o arquivo PDF mestre (relativo a input_pdfs/ ou absoluto).')
     parser_process.add_argument('--competence', required=True, help='Competência no formato MMYYYY (ex: 032025).')
+    parser_process.add_argument('--mmap', action='store_true', help='Lê o PDF mestre via mmap (recomendado para PDFs escaneados muito grandes).')
+    parser_process.add_argument('--profile', nargs='?', const='', metavar='PREFIXO', help='Perfila a execução e grava PREFIXO.collapsed (padrão: profiles/<acao>-<data_hora>).')
+    parser_process.add_argument('--profile-mode', choices=PROFILE_MODES, default=DEFAULT_PROFILE_MODE, help='Com --profile: "sample" (padrão, só amostragem, tempos por etapa fiéis) ou "cprofile" (gera também PREFIXO.pstats, mas distorce os tempos).')
     parser_process.set_defaults(func=run_process)
 
     # --- Sub-comando para Enviar Holerites ---
     parser_send = subparsers.add_parser('send', help='Processa e envia os holerites da competência via WhatsApp (Fase 4).')
     parser_send.add_argument('--pdf', required=True, help='Caminho para o arquivo PDF mestre (relativo a input_pdfs/ ou absoluto).')
     parser_send.add_argument('--competence', required=True, help='Competência no formato MMYYYY (ex: 032025).')
+    parser_send.add_argument('--mmap', action='store_true', help='Lê o PDF mestre via mmap (recomendado para PDFs escaneados muito grandes).')
+    parser_send.add_argument('--profile', nargs='?', const='', metavar='PREFIXO', help='Perfila a execução e grava PREFIXO.collapsed (padrão: profiles/<acao>-<data_hora>).')
+    parser_send.add_argument('--profile-mode', choices=PROFILE_MODES, default=DEFAULT_PROFILE_MODE, help='Com --profile: "sample" (padrão, só amostragem, tempos por etapa fiéis) ou "cprofile" (gera também PREFIXO.pstats, mas distorce os tempos).')
     parser_send.set_defaults(func=run_send)
 
     # --- Sub-comando para Iniciar o Chatbot ---
     parser_chatbot = subparsers.add_parser('chatbot', help='Inicia o servidor do chatbot para responder solicitações (Fase 5).')
+    parser_chatbot.add_argument('--profile', nargs='?', const='', metavar='PREFIXO', help='Perfila a execução e grava PREFIXO.collapsed (padrão: profiles/<acao>-<data_hora>).')
+    parser_chatbot.add_argument('--profile-mode', choices=PROFILE_MODES, default=DEFAULT_PROFILE_MODE, help='Com --profile: "sample" (padrão, só amostragem, tempos por etapa fiéis) ou "cprofile" (gera também PREFIXO.pstats, mas distorce os tempos).')
     parser_chatbot.set_defaults(func=run_chatbot)
 
     # Analisa os argumentos passados na linha de comando
     args = parser.parse_args()
 
     # Chama a função associada à ação escolhida
-    args.func(args)
\ No newline at end of file
+    profile_prefix = get_profile_prefix(args)
+    if profile_prefix and args.action != 'chatbot': # O chatbot perfila o próprio subprocesso
+        print(f"Perfilamento ativo. Resultados em: {profile_prefix}.*")
+        with profile_run(profile_prefix, args.profile_mode):
+            args.func(args)
+    else:
+        args.func(args)
\ No newline at end of file
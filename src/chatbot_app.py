@@ -8,6 +8,7 @@ from pathlib import Path
 
 from data_manager import get_matricula_by_whatsapp, get_whatsapp_number # Reutiliza o data manager
 from whatsapp_sender import send_whatsapp_message # Reutiliza o sender
+from profiler import is_enabled as profiling_enabled
 # Importe aqui a função para fazer upload para a nuvem e obter URL
 # from cloud_uploader import upload_and_get_url # Módulo hipotético
 
@@ -118,4 +119,10 @@ if __name__ == "__main__":
     print("Iniciando servidor Flask para o chatbot...")
     print(f"Webhook esperado em /whatsapp_webhook")
     print(f"Use ngrok ou similar para expor a porta 5000 publicamente.")
-    app.run(debug=True, port=5000, host='0.0.0.0') # Escuta em todas as interfaces
+    if profiling_enabled():
+        # Perfilamento (main.py chatbot --profile): sem reloader (que roda o app em outro processo)
+        # e sem threads, para que as requisições sejam atendidas na thread perfilada
+        print("Perfilamento ativo: reloader e threads do Flask desativados.")
+        app.run(debug=True, port=5000, host='0.0.0.0', use_reloader=False, threaded=False)
+    else:
+        app.run(debug=True, port=5000, host='0.0.0.0') # Escuta em todas as interfaces
@@ -1,8 +1,11 @@
 # src/pdf_processor.py
 import os
 import re
+import mmap
+import secrets
 from pypdf import PdfReader, PdfWriter
 from pathlib import Path
+from profiler import stage
 
 # -- FUNÇÃO 1: Encontrar Páginas (com nova estratégia de Regex) --
 def find_payslip_starts(reader: PdfReader):
@@ -31,7 +34,8 @@ def find_payslip_starts(reader: PdfReader):
     for page_num, page in enumerate(reader.pages):
         try:
             # Extrai o texto da página
-            text = page.extract_text()
+            with stage("extract_text"):
+                text = page.extract_text()
             if not text:
                  print(f"Aviso: Página {page_num+1} sem texto extraível.")
                  continue
@@ -107,15 +111,83 @@ def find_payslip_starts(reader: PdfReader):
     return payslips
 
 # -- FUNÇÃO 2: Dividir e Encriptar (Garantir que está definida AQUI, antes do __main__) --
-def split_encrypt_pdf(master_pdf_path: str, output_base_dir: str, competence: str):
-    # (O código desta função permanece o mesmo da resposta anterior)
-    # ... (Cole o código completo da função split_encrypt_pdf aqui) ...
+def split_encrypt_pdf(master_pdf_path: str, output_base_dir: str, competence: str, use_mmap: bool = False):
+    """
+    Divide o PDF mestre em um PDF encriptado por matrícula.
+    Com use_mmap=True o mestre é lido via mmap (sem buffers grandes em memória),
+    útil para PDFs escaneados de centenas de MB.
+    Retorna a lista de caminhos dos arquivos gerados.
+    """
+    master_file = None
+    master_map = None
     try:
-        reader = PdfReader(master_pdf_path)
+        with stage("open_master"):
+            if use_mmap:
+                master_file = open(master_pdf_path, "rb")
+                master_map = mmap.mmap(master_file.fileno(), 0, access=mmap.ACCESS_READ)
+                reader = PdfReader(master_map)
+            else:
+                reader = PdfReader(master_pdf_path)
     except Exception as e:
         print(f"Erro ao abrir o PDF mestre '{master_pdf_path}': {e}")
+        _close_master(master_map, master_file)
         return []
 
+    # O PdfReader lê as páginas sob demanda, então o mmap precisa continuar aberto até o fim
+    try:
+        return _split_encrypt_reader(reader, master_pdf_path, output_base_dir, competence)
+    finally:
+        _close_master(master_map, master_file)
+
+
+def _close_master(master_map, master_file):
+    """Fecha o mmap e o arquivo do PDF mestre, se foram abertos."""
+    if master_map is not None:
+        master_map.close()
+    if master_file is not None:
+        master_file.close()
+
+
+def _write_pdf_atomic(writer: PdfWriter, output_path: Path):
+    """
+    Grava o PDF em um arquivo temporário no mesmo diretório e depois renomeia
+    para o nome final. Assim nunca fica um PDF pela metade em output_payslips
+    se o processo morrer durante a gravação.
+    """
+    tmp_path = output_path.with_name(f".{output_path.name}.{secrets.token_hex(4)}.tmp")
+    # Modo 0666 como num open() comum: o kernel aplica a umask atual do processo
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+    try:
+        with os.fdopen(fd, "wb") as f_out:
+            writer.write(f_out)
+            f_out.flush()
+            os.fsync(f_out.fileno())
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _remove_stale_temp_files(output_dir: Path):
+    """Remove temporários deixados por _write_pdf_atomic em execuções interrompidas."""
+    if not output_dir.is_dir():
+        return
+    for tmp_path in output_dir.glob(".*.pdf.*.tmp"):
+        try:
+            tmp_path.unlink()
+            print(f"Removido arquivo temporário de execução anterior: {tmp_path.name}")
+        except OSError as e:
+            print(f"Aviso: Não foi possível remover o temporário {tmp_path.name}: {e}")
+
+
+def _split_encrypt_reader(reader: PdfReader, master_pdf_path: str, output_base_dir: str, competence: str):
+    """Corpo do split_encrypt_pdf, executado com o reader já aberto."""
+    output_dir = Path(output_base_dir) / competence
+    _remove_stale_temp_files(output_dir)
+
     if reader.is_encrypted:
         print(f"Erro: O PDF mestre '{master_pdf_path}' está criptografado. Remova a senha antes de processar.")
         return []
@@ -123,13 +195,13 @@ def split_encrypt_pdf(master_pdf_path: str, output_base_dir: str, competence: st
     print(f"\nProcessando PDF: {master_pdf_path} para competência {competence}...")
 
     # Chama a função para encontrar as páginas DENTRO desta função
-    payslips_pages = find_payslip_starts(reader) # Usa a função atualizada
+    with stage("find_payslip_starts"):
+        payslips_pages = find_payslip_starts(reader) # Usa a função atualizada
 
     if not payslips_pages:
         print("Nenhum holerite individual identificado. Abortando a divisão.")
         return []
 
-    output_dir = Path(output_base_dir) / competence
     output_dir.mkdir(parents=True, exist_ok=True)
 
     generated_files = []
@@ -142,11 +214,12 @@ def split_encrypt_pdf(master_pdf_path: str, output_base_dir: str, competence: st
             continue
 
         print(f"  -> Criando PDF para Matrícula: {matricula} (Páginas: {[p+1 for p in page_indices]})")
-        for page_index in page_indices:
-             if 0 <= page_index < len(reader.pages):
-                  writer.add_page(reader.pages[page_index])
-             else:
-                  print(f"Aviso: Índice de página inválido ({page_index}) para matrícula {matricula}. Pulando página.")
+        with stage("copy_pages"):
+            for page_index in page_indices:
+                 if 0 <= page_index < len(reader.pages):
+                      writer.add_page(reader.pages[page_index])
+                 else:
+                      print(f"Aviso: Índice de página inválido ({page_index}) para matrícula {matricula}. Pulando página.")
 
         if not writer.pages:
              print(f"Aviso: Nenhuma página válida adicionada para matrícula {matricula}. Pulando.")
@@ -157,14 +230,15 @@ def split_encrypt_pdf(master_pdf_path: str, output_base_dir: str, competence: st
 
         try:
             # Encripta com a matrícula como senha
-            writer.encrypt(user_password=str(matricula), owner_password=None)
+            with stage("encrypt"):
+                writer.encrypt(user_password=str(matricula), owner_password=None)
         except Exception as e:
             print(f"Erro ao tentar encriptar PDF para matrícula {matricula}: {e}")
             continue # Pula este funcionário
 
         try:
-            with open(output_path, "wb") as f_out:
-                writer.write(f_out)
+            with stage("write_pdf"):
+                _write_pdf_atomic(writer, output_path)
             # print(f"    -> Salvo e protegido: {output_path}") # Log opcional
             generated_files.append(str(output_path))
         except Exception as e:
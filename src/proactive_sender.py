@@ -6,17 +6,19 @@ from pathlib import Path
 from pdf_processor import split_encrypt_pdf
 from data_manager import get_whatsapp_number
 from whatsapp_sender import send_whatsapp_message
+from profiler import stage
 # Importe aqui a função para fazer upload para a nuvem e obter URL (ex: upload_to_s3)
 # from cloud_uploader import upload_and_get_url # Módulo hipotético
 
-def run_proactive_distribution(master_pdf_path: str, competence: str, output_base_dir: str):
+def run_proactive_distribution(master_pdf_path: str, competence: str, output_base_dir: str, use_mmap: bool = False):
     """
     Executa a divisão do PDF e o envio proativo dos holerites.
     """
     print(f"Iniciando distribuição proativa para competência {competence}...")
 
     # 1. Processar o PDF mestre
-    generated_files = split_encrypt_pdf(master_pdf_path, output_base_dir, competence)
+    with stage("split_encrypt_pdf"):
+        generated_files = split_encrypt_pdf(master_pdf_path, output_base_dir, competence, use_mmap=use_mmap)
 
     if not generated_files:
         print("Nenhum arquivo PDF individual foi gerado. Encerrando.")
@@ -41,7 +43,8 @@ def run_proactive_distribution(master_pdf_path: str, competence: str, output_bas
             continue
 
         # 2. Obter número de WhatsApp
-        whatsapp_number = get_whatsapp_number(matricula)
+        with stage("lookup_whatsapp"):
+            whatsapp_number = get_whatsapp_number(matricula)
         if not whatsapp_number:
             print(f"Aviso: Número de WhatsApp não encontrado para matrícula {matricula}. Pulando.")
             fail_count += 1
@@ -72,12 +75,13 @@ def run_proactive_distribution(master_pdf_path: str, competence: str, output_bas
         )
 
         print(f"  Enviando para {matricula} ({whatsapp_number}) com URL: {pdf_public_url} ...")
-        message_sid = send_whatsapp_message(
-            to_number=whatsapp_number,
-            body=message_body,
-            #media_url=pdf_public_url - Correto
-            media_url=None # Teste
-        )
+        with stage("twilio_send"):
+            message_sid = send_whatsapp_message(
+                to_number=whatsapp_number,
+                body=message_body,
+                #media_url=pdf_public_url - Correto
+                media_url=None # Teste
+            )
 
         if message_sid:
             print(f"  -> Envio para {matricula} bem-sucedido (SID: {message_sid}).")
@@ -0,0 +1,178 @@
+# src/profiler.py
+# Perfilamento opcional das execuções (opção --profile do main.py).
+# Modos:
+#   sample   (padrão) -> só a amostragem de pilha; gera <prefixo>.collapsed (flamegraph.pl, speedscope, inferno)
+#   cprofile          -> amostragem + cProfile; gera também <prefixo>.pstats (pstats, snakeviz, etc.)
+# O cProfile deixa o código Python bem mais lento que esperas de rede/disco, distorcendo
+# a divisão de tempo entre as etapas; por isso o modo padrão não o liga.
+# As etapas nomeadas (stage) aparecem como raiz das pilhas no flamegraph e num resumo de tempos.
+import cProfile
+import contextlib
+import runpy
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+DEFAULT_SAMPLE_INTERVAL = 0.005 # 5 ms entre amostras de pilha
+PROFILE_MODES = ("sample", "cprofile")
+DEFAULT_PROFILE_MODE = "sample"
+
+# Sessão ativa (None = perfilamento desligado). Consultada por stage() e is_enabled().
+_active = None
+
+# Contexto reutilizável devolvido por stage() quando o perfilamento está desligado
+_NULL_STAGE = contextlib.nullcontext()
+
+
+def is_enabled():
+    """Indica se há uma sessão de perfilamento ativa."""
+    return _active is not None
+
+
+def stage(name: str):
+    """
+    Marca uma etapa nomeada (ex: 'extract_text', 'twilio_send') para o perfilamento.
+    Uso: `with stage('encrypt'): ...`. Sem sessão ativa não faz nada.
+    """
+    if _active is None:
+        return _NULL_STAGE
+    return _active.stage(name)
+
+
+class _ProfileSession:
+    """Amostragem da pilha da thread principal (e cProfile opcional), com as etapas nomeadas."""
+
+    def __init__(self, output_prefix: Path, mode: str, sample_interval: float):
+        self.output_prefix = output_prefix
+        self.sample_interval = sample_interval
+        self.profile = cProfile.Profile() if mode == "cprofile" else None
+        self.stage_stack = []
+        self.child_time_stack = [] # tempo gasto em sub-etapas, paralelo a stage_stack
+        self.stage_totals = defaultdict(float) # tempo inclusivo (com sub-etapas)
+        self.stage_self = defaultdict(float) # tempo próprio (sem sub-etapas)
+        self.stage_counts = Counter()
+        self.samples = Counter()
+        self.thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True)
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        self.stage_stack.append(name)
+        self.child_time_stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            child_time = self.child_time_stack.pop()
+            self.stage_stack.pop()
+            self.stage_totals[name] += elapsed
+            self.stage_self[name] += elapsed - child_time
+            self.stage_counts[name] += 1
+            if self.child_time_stack:
+                self.child_time_stack[-1] += elapsed
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._sampler.start()
+        if self.profile is not None:
+            self.profile.enable()
+
+    def stop(self):
+        if self.profile is not None:
+            self.profile.disable()
+        self._stop.set()
+        self._sampler.join()
+        self.elapsed = time.perf_counter() - self.started_at
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.sample_interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({Path(code.co_filename).name})")
+                frame = frame.f_back
+            frames.reverse()
+            stages = [f"stage:{name}" for name in self.stage_stack]
+            self.samples[";".join(stages + frames)] += 1
+
+    def write(self):
+        """Grava o .collapsed (e o .pstats no modo cprofile) e imprime o resumo das etapas."""
+        self.output_prefix.parent.mkdir(parents=True, exist_ok=True)
+        pstats_path = self.output_prefix.with_name(self.output_prefix.name + ".pstats")
+        collapsed_path = self.output_prefix.with_name(self.output_prefix.name + ".collapsed")
+
+        if self.profile is not None:
+            self.profile.dump_stats(str(pstats_path))
+        with open(collapsed_path, "w", encoding="utf-8") as f_out:
+            for stack, count in self.samples.most_common():
+                f_out.write(f"{stack} {count}\n")
+
+        print("\n--- Perfilamento ---")
+        print(f"Tempo total: {self.elapsed:.3f}s ({sum(self.samples.values())} amostras)")
+        # "Próprio" exclui as sub-etapas, então a coluna % soma no máximo 100%.
+        # "Inclusivo" conta também o tempo das etapas aninhadas.
+        print(f"  {'etapa':<22} {'próprio':>10} {'%':>6}  {'inclusivo':>10}  chamadas")
+        for name, own in sorted(self.stage_self.items(), key=lambda item: item[1], reverse=True):
+            share = (own / self.elapsed * 100) if self.elapsed else 0.0
+            print(f"  {name:<22} {own:9.3f}s {share:5.1f}%  {self.stage_totals[name]:9.3f}s  {self.stage_counts[name]}x")
+        unstaged = self.elapsed - sum(self.stage_self.values())
+        share = (unstaged / self.elapsed * 100) if self.elapsed else 0.0
+        print(f"  {'(fora de etapas)':<22} {unstaged:9.3f}s {share:5.1f}%")
+        if self.profile is not None:
+            print("Atenção: modo cprofile ativo. Os tempos acima incluem o overhead do cProfile, que pesa")
+            print("         mais em etapas Python (ex: extract_text) do que em esperas de rede/disco.")
+            print("         Para comparar etapas, use o modo 'sample'.")
+            print(f"Estatísticas cProfile: {pstats_path}")
+        print(f"Pilhas para flamegraph: {collapsed_path}")
+
+
+@contextlib.contextmanager
+def profile_run(output_prefix, mode: str = DEFAULT_PROFILE_MODE, sample_interval: float = DEFAULT_SAMPLE_INTERVAL):
+    """
+    Perfila o bloco e grava <output_prefix>.collapsed (e <output_prefix>.pstats no modo
+    cprofile) ao final, mesmo que o bloco termine com erro ou sys.exit().
+    """
+    global _active
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Modo de perfilamento inválido: '{mode}'. Use um de: {', '.join(PROFILE_MODES)}.")
+    if _active is not None:
+        raise RuntimeError("Já existe uma sessão de perfilamento ativa.")
+
+    session = _ProfileSession(Path(output_prefix), mode, sample_interval)
+    _active = session
+    session.start()
+    try:
+        yield session
+    finally:
+        session.stop()
+        _active = None
+        session.write()
+
+
+def run_script(script_path: str, output_prefix, mode: str = DEFAULT_PROFILE_MODE):
+    """Executa um script Python como __main__ dentro de profile_run."""
+    sys.argv = [script_path]
+    with profile_run(output_prefix, mode):
+        runpy.run_path(script_path, run_name="__main__")
+
+
+if __name__ == "__main__":
+    # Usado pelo main.py para perfilar scripts executados em subprocesso (ex: chatbot_app.py)
+    if len(sys.argv) != 4 or sys.argv[2] not in PROFILE_MODES:
+        print(f"Uso: python src/profiler.py <prefixo_saida> <{'|'.join(PROFILE_MODES)}> <script.py>")
+        sys.exit(1)
+
+    # Importa o próprio módulo pelo nome para que stage()/is_enabled() chamados
+    # pelo script enxerguem a mesma sessão ativa
+    import profiler
+    try:
+        profiler.run_script(sys.argv[3], sys.argv[1], sys.argv[2])
+    except KeyboardInterrupt:
+        print("\nExecução interrompida pelo usuário.")